@@ -1,17 +1,29 @@
 # Code for doc-embedding-api (FastAPI)
+import asyncio
+import atexit
+import base64
+import fcntl
 import json
 import logging
 import os
+import queue
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import re
 import time
+from functools import lru_cache
+from itertools import accumulate
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional, List
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import requests
-from qdrant_client import QdrantClient
+import httpx
+import orjson
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct, PayloadSchemaType,
@@ -19,20 +31,30 @@ from qdrant_client.models import (
 )
 from fastembed import TextEmbedding
 from fastembed.sparse.bm25 import Bm25 as SparseTextEmbedding
-from groq import Groq
+from groq import AsyncGroq
 import anthropic
+import yaml
 
 load_dotenv()
 
+# records are formatted when queued and written to stderr by a listener thread,
+# keeping log I/O off the event loop
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger("knowledge_base_app")
 
 app = FastAPI(
     title="Knowledge Base - Ingestion, Search & RAG",
-    description="Complete knowledge base system with chunking and AI-powered search"
+    description="Complete knowledge base system with chunking and AI-powered search",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -52,10 +74,64 @@ COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME")
 
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
+EMBED_BATCH_SIZE = 32
+UPSERT_BATCH_SIZE = 64
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+# seconds /stats may serve a cached collection lookup
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", 2))
+# payload fields read by /search and /rag; everything else stays on the server
+SEARCH_PAYLOAD_FIELDS = ["path", "title", "full_chunk", "chunk_index", "total_chunks"]
+# embedding runs in its own thread pool; split the cores between workers so ONNX sessions don't oversubscribe
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 2))
+# uvicorn worker processes; the same variable uvicorn's --workers flag defaults to
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+def available_cpus() -> int:
+    """
+    Count the CPUs this process may use.
+
+    A cgroup CPU quota (docker --cpus) caps the count, rounded down; otherwise
+    the affinity mask (cpusets), falling back to the host CPU count.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: quota is -1 when unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = f.read().strip()
+        except OSError:
+            return cpus
+    try:
+        if quota not in ("max", "-1"):
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except ValueError:
+        pass
+    return cpus
+
+AVAILABLE_CPUS = available_cpus()
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", max(1, AVAILABLE_CPUS // (EMBED_WORKERS * WEB_CONCURRENCY))))
+
+FRONTMATTER_RE = re.compile(
+    r"\A---[ \t]*\r?\n(.*?)(?:\r?\n)?^---[ \t]*(?:\r?\n|\Z)(.*)",
+    re.DOTALL | re.MULTILINE
+)
+# BaseLoader keeps every scalar as the text Wiki.js wrote ("2024", "Yes", "") instead of
+# resolving ints, bools and nulls; libyaml-backed when available, pure-Python otherwise
+YAML_LOADER = getattr(yaml, "CBaseLoader", yaml.BaseLoader)
 
 WIKIJS_DOMAIN = os.getenv("WIKIJS_DOMAIN")
 if WIKIJS_DOMAIN and not WIKIJS_DOMAIN.startswith(("http://", "https://")):
     WIKIJS_DOMAIN = f"http://{WIKIJS_DOMAIN}"
+# result of the last successful /start-process, shared by every worker in the container
+WIKIJS_SETUP_MARKER = os.getenv("WIKIJS_SETUP_MARKER", "/tmp/wikijs-setup-result.json")
+WIKIJS_SETUP_TTL = float(os.getenv("WIKIJS_SETUP_TTL", 86400))
+WIKIJS_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 WIKIJS_ADMIN_EMAIL = os.getenv("WIKIJS_ADMIN_EMAIL")
 WIKIJS_ADMIN_PASSWORD = os.getenv("WIKIJS_ADMIN_PASSWORD")
 KB_REPO_SSH_URL = os.getenv("KB_REPO_SSH_URL")
@@ -64,25 +140,185 @@ KB_GIT_COMMIT_EMAIL = os.getenv("KB_GIT_COMMIT_EMAIL")
 KB_GIT_COMMIT_NAME = os.getenv("KB_GIT_COMMIT_NAME")
 KB_GIT_SSH_PRIVATE_KEY = os.getenv("KB_GIT_SSH_PRIVATE_KEY", "")
 use_https = QDRANT_URL.startswith("https://") if QDRANT_URL else False
+# gRPC keeps one HTTP/2 channel open; set QDRANT_PREFER_GRPC=false for REST-only deployments
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "int8").lower()
+# path prefix when the REST API sits behind a reverse proxy, e.g. "qdrant" for https://host/qdrant
+QDRANT_PREFIX = os.getenv("QDRANT_PREFIX")
 
 
 qdrant_port = 443 if use_https else 6333
 
-qdrant_client = QdrantClient(
+qdrant_client = AsyncQdrantClient(
     url=QDRANT_URL,
     api_key=QDRANT_API_KEY,
     timeout=60,
-    prefer_grpc=False,
+    prefer_grpc=QDRANT_PREFER_GRPC,
+    grpc_port=QDRANT_GRPC_PORT,
     https=use_https,
-    port=qdrant_port
+    port=qdrant_port,
+    prefix=QDRANT_PREFIX
 )
  
 
-embedding_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5", max_length=512)
+embedding_model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5", max_length=512, threads=EMBED_THREADS)
 sparse_model = SparseTextEmbedding(model_name="Qdrant/bm25")
+embed_pool = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+
+groq_client = AsyncGroq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+anthropic_client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
+
+# one keep-alive client for every Wiki.js setup call; the transport retries failed connects
+wikijs_client = httpx.AsyncClient(
+    base_url=WIKIJS_DOMAIN or "",
+    timeout=30,
+    headers={
+        "Content-Type": "application/json",
+        "User-Agent": WIKIJS_USER_AGENT
+    },
+    # httpx ignores client-level pool and HTTP/2 settings when a transport is given, so they live here
+    transport=httpx.AsyncHTTPTransport(
+        retries=2,
+        http2=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    )
+)
+# separate client without connect retries so the liveness probe fails within its 2s timeout
+wikijs_probe_client = httpx.AsyncClient(
+    base_url=WIKIJS_DOMAIN or "",
+    timeout=2,
+    headers={"User-Agent": WIKIJS_USER_AGENT}
+)
 
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
-anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
+stats_cache = {"value": None, "expires": 0.0}
+stats_cache_lock = asyncio.Lock()
+
+wikijs_probe = {"alive": False, "expires": 0.0}
+wikijs_token = {"jwt": None, "expires": 0.0}
+wiki_setup_lock = asyncio.Lock()
+
+# Wiki.js expects every storage target in updateTargets; all but git stay disabled
+DISABLED_STORAGE_TARGETS = [
+    {
+        "isEnabled": False,
+        "key": "s3",
+        "config": [
+            {"key": "region", "value": "{\"v\":\"\"}"},
+            {"key": "bucket", "value": "{\"v\":\"\"}"},
+            {"key": "accessKeyId", "value": "{\"v\":\"\"}"},
+            {"key": "secretAccessKey", "value": "{\"v\":\"\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "azure",
+        "config": [
+            {"key": "accountName", "value": "{\"v\":\"\"}"},
+            {"key": "accountKey", "value": "{\"v\":\"\"}"},
+            {"key": "containerName", "value": "{\"v\":\"wiki\"}"},
+            {"key": "storageTier", "value": "{\"v\":\"Cool\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "box",
+        "config": [
+            {"key": "clientId", "value": "{\"v\":\"\"}"},
+            {"key": "clientSecret", "value": "{\"v\":\"\"}"},
+            {"key": "rootFolder", "value": "{\"v\":\"\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "digitalocean",
+        "config": [
+            {"key": "endpoint", "value": "{\"v\":\"nyc3.digitaloceanspaces.com\"}"},
+            {"key": "bucket", "value": "{\"v\":\"\"}"},
+            {"key": "accessKeyId", "value": "{\"v\":\"\"}"},
+            {"key": "secretAccessKey", "value": "{\"v\":\"\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "dropbox",
+        "config": [
+            {"key": "appKey", "value": "{\"v\":\"\"}"},
+            {"key": "appSecret", "value": "{\"v\":\"\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "gdrive",
+        "config": [
+            {"key": "clientId", "value": "{\"v\":\"\"}"},
+            {"key": "clientSecret", "value": "{\"v\":\"\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "disk",
+        "config": [
+            {"key": "path", "value": "{\"v\":\"\"}"},
+            {"key": "createDailyBackups", "value": "{\"v\":false}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "onedrive",
+        "config": [
+            {"key": "clientId", "value": "{\"v\":\"\"}"},
+            {"key": "clientSecret", "value": "{\"v\":\"\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "s3generic",
+        "config": [
+            {"key": "endpoint", "value": "{\"v\":\"https://service.region.example.com\"}"},
+            {"key": "bucket", "value": "{\"v\":\"\"}"},
+            {"key": "accessKeyId", "value": "{\"v\":\"\"}"},
+            {"key": "secretAccessKey", "value": "{\"v\":\"\"}"},
+            {"key": "sslEnabled", "value": "{\"v\":true}"},
+            {"key": "s3ForcePathStyle", "value": "{\"v\":false}"},
+            {"key": "s3BucketEndpoint", "value": "{\"v\":false}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    },
+    {
+        "isEnabled": False,
+        "key": "sftp",
+        "config": [
+            {"key": "host", "value": "{\"v\":\"\"}"},
+            {"key": "port", "value": "{\"v\":22}"},
+            {"key": "authMode", "value": "{\"v\":\"privateKey\"}"},
+            {"key": "username", "value": "{\"v\":\"\"}"},
+            {"key": "privateKey", "value": "{\"v\":\"\"}"},
+            {"key": "passphrase", "value": "{\"v\":\"\"}"},
+            {"key": "password", "value": "{\"v\":\"\"}"},
+            {"key": "basePath", "value": "{\"v\":\"/root/wiki\"}"}
+        ],
+        "mode": "push",
+        "syncInterval": "P0D"
+    }
+]
 
 
 class IngestPayload(BaseModel):
@@ -110,86 +346,159 @@ class SearchResult(BaseModel):
     total_chunks: int
 
 
+def format_frontmatter_value(value) -> str:
+    """Flatten a frontmatter value to text, joining YAML lists like Wiki.js' comma-separated tags."""
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
 def extract_frontmatter(content: str) -> tuple:
-    frontmatter = {}
-    if content.startswith('---'):
-        parts = content.split('---', 2)
-        if len(parts) >= 3:
-            frontmatter_text = parts[1].strip()
-            for line in frontmatter_text.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    frontmatter[key.strip()] = value.strip()
-            content = parts[2].strip()
-    return frontmatter, content
+    match = FRONTMATTER_RE.match(content)
+    if not match:
+        return {}, content
+    try:
+        frontmatter = yaml.load(match.group(1), Loader=YAML_LOADER)
+    except yaml.YAMLError as e:
+        # hand-written pages often have unquoted colons; fall back to plain key: value lines
+        logger.warning("Frontmatter is not valid YAML, parsing as key/value lines: %s", e)
+        frontmatter = {}
+        for line in match.group(1).splitlines():
+            if ':' in line:
+                key, value = line.split(':', 1)
+                frontmatter[key.strip()] = value.strip()
+    if not isinstance(frontmatter, dict):
+        frontmatter = {}
+    # stored values must stay strings for the string-typed search results
+    frontmatter = {
+        str(key): format_frontmatter_value(value) for key, value in frontmatter.items()
+    }
+    return frontmatter, match.group(2).strip()
 
 def split_into_chunks(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
     words = text.split()
     if len(words) <= chunk_size:
         return [text]
+    # join once and slice each window out by character offset
+    joined = ' '.join(words)
+    word_starts = list(accumulate((len(word) + 1 for word in words), initial=0))
     chunks = []
-    start = 0
-    while start < len(words):
-        end = start + chunk_size
-        chunk_words = words[start:end]
-        chunks.append(' '.join(chunk_words))
-        start = end - overlap
+    for start in range(0, len(words), chunk_size - overlap):
+        end = min(start + chunk_size, len(words))
+        chunks.append(joined[word_starts[start]:word_starts[end] - 1])
         if end >= len(words):
             break
     return chunks
 
-def generate_point_id(path: str, repo: str, chunk_index: int = 0) -> str:
-    unique_string = f"{repo}:{path}:chunk_{chunk_index}"
-    return hashlib.md5(unique_string.encode()).hexdigest()
+def point_id_generator(path: str, repo: str):
+    """
+    Return a function mapping a chunk index to its point ID.
+
+    IDs are md5("{repo}:{path}:chunk_{idx}") so re-ingesting a document overwrites
+    its existing points; the shared prefix is hashed once and the digest state is
+    copied for each chunk.
+    """
+    prefix_hash = hashlib.md5(f"{repo}:{path}:chunk_".encode())
+
+    def generate_point_id(chunk_index: int) -> str:
+        chunk_hash = prefix_hash.copy()
+        chunk_hash.update(str(chunk_index).encode())
+        return chunk_hash.hexdigest()
+
+    return generate_point_id
 
-def ensure_indexes_exist():
+async def ensure_indexes_exist():
     try:
-        qdrant_client.get_collection(COLLECTION_NAME)
+        collection_info = await qdrant_client.get_collection(COLLECTION_NAME)
+        existing_indexes = set(collection_info.payload_schema)
         indexes_to_create = [
             ("path", PayloadSchemaType.KEYWORD),
             ("repo", PayloadSchemaType.KEYWORD)
         ]
         for field_name, field_type in indexes_to_create:
+            if field_name in existing_indexes:
+                logger.info("Index already exists %s", field_name)
+                continue
             try:
-                qdrant_client.create_payload_index(
+                await qdrant_client.create_payload_index(
                     collection_name=COLLECTION_NAME,
                     field_name=field_name,
                     field_schema=field_type
                 )
                 logger.info("Created index %s", field_name)
             except Exception as e:
-                if "already exists" in str(e).lower():
-                    logger.info("Index already exists %s", field_name)
-                else:
-                    logger.error("Index creation failed for %s: %s", field_name, str(e)[:100])
+                logger.error("Index creation failed for %s: %s", field_name, str(e)[:100])
         return True
     except Exception as e:
         logger.exception("Index check failed: %s", e)
         return False
 
-def create_collection_if_not_exists():
+def build_quantization_config():
+    """
+    Build the dense-vector quantization config selected by QDRANT_QUANTIZATION.
+
+    "int8" keeps 1 byte per dimension, "binary" 1 bit; the full-precision vectors
+    stay on disk for rescoring. "none" disables quantization.
+    """
+    if QDRANT_QUANTIZATION == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    if QDRANT_QUANTIZATION == "int8":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+    return None
+
+async def ensure_quantization_enabled():
+    quantization_config = build_quantization_config()
+    if quantization_config is None:
+        return
+    try:
+        collection_info = await qdrant_client.get_collection(COLLECTION_NAME)
+        if collection_info.config.quantization_config is None:
+            await qdrant_client.update_collection(
+                collection_name=COLLECTION_NAME,
+                quantization_config=quantization_config
+            )
+            logger.info("Enabled %s quantization on %s", QDRANT_QUANTIZATION, COLLECTION_NAME)
+    except Exception as e:
+        logger.exception("Quantization update failed: %s", e)
+
+async def create_collection_if_not_exists():
     try:
-        collections = qdrant_client.get_collections()
+        collections = await qdrant_client.get_collections()
         collection_names = [col.name for col in collections.collections]
         if COLLECTION_NAME not in collection_names:
             logger.info("Creating collection %s", COLLECTION_NAME)
-            qdrant_client.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config={
-                    "dense": VectorParams(size=384, distance=Distance.COSINE)
-                },
-                sparse_vectors_config={
-                    "sparse": SparseVectorParams(
-                        index=SparseIndexParams(on_disk=False)
-                    )
-                }
-            )
+            try:
+                await qdrant_client.create_collection(
+                    collection_name=COLLECTION_NAME,
+                    vectors_config={
+                        "dense": VectorParams(size=384, distance=Distance.COSINE)
+                    },
+                    sparse_vectors_config={
+                        "sparse": SparseVectorParams(
+                            index=SparseIndexParams(on_disk=False)
+                        )
+                    },
+                    quantization_config=build_quantization_config()
+                )
+            except Exception:
+                # with several workers another one may have created it first
+                if not await qdrant_client.collection_exists(COLLECTION_NAME):
+                    raise
+                logger.info("Collection %s was created by another worker", COLLECTION_NAME)
             logger.info("Creating payload indexes")
-            ensure_indexes_exist()
+            await ensure_indexes_exist()
             logger.info("Collection created with hybrid vector support")
         else:
             logger.info("Collection %s already exists", COLLECTION_NAME)
-            ensure_indexes_exist()
+            await ensure_indexes_exist()
+            await ensure_quantization_enabled()
     except Exception as e:
         logger.exception("Collection setup error: %s", e)
         raise
@@ -226,7 +535,224 @@ def format_ssh_key(ssh_key: str) -> str:
 
     return ssh_key
 
-def hybrid_search(query: str, limit: int):
+# the key is fixed for the process lifetime, so format and encode it once at import
+SSH_KEY_CONFIG_VALUE = json.dumps({"v": format_ssh_key(KB_GIT_SSH_PRIVATE_KEY)}) if KB_GIT_SSH_PRIVATE_KEY else ""
+
+def minify_graphql(query: str) -> str:
+    """Collapse a GraphQL document's indentation and newlines into single spaces."""
+    return re.sub(r"\s+", " ", query).strip()
+
+# Wiki.js setup requests only depend on settings fixed at startup, so their bodies
+# are built and serialized once here instead of on every /start-process call
+WIKIJS_ADMIN_BODY = orjson.dumps({
+    "adminEmail": WIKIJS_ADMIN_EMAIL,
+    "adminPassword": WIKIJS_ADMIN_PASSWORD,
+    "adminPasswordConfirm": WIKIJS_ADMIN_PASSWORD,
+    "siteUrl": WIKIJS_DOMAIN,
+    "telemetry": True
+})
+
+WIKIJS_LOGIN_BODY = orjson.dumps([{
+    "operationName": None,
+    "variables": {
+        "username": WIKIJS_ADMIN_EMAIL,
+        "password": WIKIJS_ADMIN_PASSWORD,
+        "strategy": "local"
+    },
+    "extensions": {},
+    "query": minify_graphql("""mutation ($username: String!, $password: String!, $strategy: String!) {
+        authentication {
+            login(username: $username, password: $password, strategy: $strategy) {
+                responseResult {
+                    succeeded
+                    errorCode
+                    slug
+                    message
+                    __typename
+                }
+                jwt
+                mustChangePwd
+                mustProvideTFA
+                mustSetupTFA
+                continuationToken
+                redirect
+                tfaQRImage
+                __typename
+            }
+            __typename
+        }
+    }""")
+}])
+
+GIT_STORAGE_TARGET = {
+    "isEnabled": True,
+    "key": "git",
+    "config": [
+        {"key": "authType", "value": "{\"v\":\"ssh\"}"},
+        {"key": "repoUrl", "value": f"{{\"v\":\"{KB_REPO_SSH_URL}\"}}"},
+        {"key": "branch", "value": f"{{\"v\":\"{KB_GIT_BRANCH}\"}}"},
+        {"key": "sshPrivateKeyMode", "value": "{\"v\":\"contents\"}"},
+        {"key": "sshPrivateKeyPath", "value": "{\"v\":\"\"}"},
+        {"key": "sshPrivateKeyContent", "value": SSH_KEY_CONFIG_VALUE},
+        {"key": "verifySSL", "value": "{\"v\":true}"},
+        {"key": "basicUsername", "value": "{\"v\":\"\"}"},
+        {"key": "basicPassword", "value": "{\"v\":\"\"}"},
+        {"key": "defaultEmail", "value": f"{{\"v\":\"{KB_GIT_COMMIT_EMAIL}\"}}"},
+        {"key": "defaultName", "value": f"{{\"v\":\"{KB_GIT_COMMIT_NAME}\"}}"},
+        {"key": "localRepoPath", "value": "{\"v\":\"./data/repo\"}"},
+        {"key": "alwaysNamespace", "value": "{\"v\":false}"},
+        {"key": "gitBinaryPath", "value": "{\"v\":\"\"}"}
+    ],
+    "mode": "sync",
+    "syncInterval": "PT5M"
+}
+
+GIT_CONFIG_OPERATION = {
+    "operationName": None,
+    "variables": {
+        "targets": [GIT_STORAGE_TARGET, *DISABLED_STORAGE_TARGETS]
+    },
+    "extensions": {},
+    "query": minify_graphql("""mutation ($targets: [StorageTargetInput]!) {
+        storage {
+            updateTargets(targets: $targets) {
+                responseResult {
+                    succeeded
+                    errorCode
+                    slug
+                    message
+                    __typename
+                }
+                __typename
+            }
+            __typename
+        }
+    }""")
+}
+
+GUEST_PERMISSIONS_OPERATION = {
+    "operationName": None,
+    "variables": {
+        "id": 2,
+        "name": "Guests",
+        "redirectOnLogin": "/",
+        "permissions": [],
+        "pageRules": [
+            {
+                "id": "guest",
+                "path": "",
+                "roles": ["read:pages", "read:assets", "read:comments"],
+                "match": "START",
+                "deny": False,
+                "locales": []
+            }
+        ]
+    },
+    "extensions": {},
+    "query": minify_graphql("""mutation ($id: Int!, $name: String!, $redirectOnLogin: String!, $permissions: [String]!, $pageRules: [PageRuleInput]!) {
+        groups {
+            update(id: $id, name: $name, redirectOnLogin: $redirectOnLogin, permissions: $permissions, pageRules: $pageRules) {
+                responseResult {
+                    succeeded
+                    errorCode
+                    slug
+                    message
+                    __typename
+                }
+                __typename
+            }
+            __typename
+        }
+    }""")
+}
+
+WIKIJS_SETUP_MUTATIONS_BODY = orjson.dumps([GIT_CONFIG_OPERATION, GUEST_PERMISSIONS_OPERATION])
+
+def jwt_expiry(token: str) -> float:
+    """Read a JWT's exp claim without verifying the signature; 0 when it can't be parsed."""
+    try:
+        claims_segment = token.split(".")[1]
+        claims = orjson.loads(base64.urlsafe_b64decode(claims_segment + "=" * (-len(claims_segment) % 4)))
+        return float(claims.get("exp", 0))
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return 0.0
+
+def read_wiki_setup_marker():
+    try:
+        # an expired marker reruns setup, e.g. after the Wiki.js database was reset
+        if time.time() - os.path.getmtime(WIKIJS_SETUP_MARKER) > WIKIJS_SETUP_TTL:
+            return None
+        with open(WIKIJS_SETUP_MARKER, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, orjson.JSONDecodeError) as e:
+        logger.warning("Ignoring unreadable setup marker %s: %s", WIKIJS_SETUP_MARKER, e)
+        return None
+
+def write_wiki_setup_marker(result: dict):
+    # write then rename so other workers never read a partial file
+    tmp_path = f"{WIKIJS_SETUP_MARKER}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(result))
+    os.replace(tmp_path, WIKIJS_SETUP_MARKER)
+
+async def acquire_wiki_setup_flock(lock_file):
+    # poll instead of a blocking flock so waiters don't hold default-executor threads
+    while True:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            await asyncio.sleep(0.5)
+
+async def wikijs_reachable() -> bool:
+    """
+    Probe Wiki.js with a short-timeout HEAD request.
+
+    The answer is cached for a few seconds so retry storms against a dead
+    Wiki.js fail fast without opening a connection per call.
+    """
+    if time.monotonic() < wikijs_probe["expires"]:
+        return wikijs_probe["alive"]
+    try:
+        response = await wikijs_probe_client.head("/")
+        alive = response.status_code < 500
+    except httpx.HTTPError as e:
+        logger.warning("Wiki.js probe failed: %s", e)
+        alive = False
+    wikijs_probe["alive"] = alive
+    wikijs_probe["expires"] = time.monotonic() + 5
+    return alive
+
+async def run_embedding(func, *args):
+    """Run a blocking embedding call on the embedding thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(embed_pool, func, *args)
+
+def embed_chunks(chunks: List[str]) -> list:
+    """Embed document chunks in batches, returning one (dense, sparse) pair per chunk."""
+    dense_embeddings = embedding_model.embed(chunks, batch_size=EMBED_BATCH_SIZE)
+    sparse_embeddings = sparse_model.embed(chunks, batch_size=EMBED_BATCH_SIZE)
+    return list(zip(dense_embeddings, sparse_embeddings))
+
+@lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+def embed_query(query: str) -> tuple:
+    """
+    Embed a search query into its dense vector and sparse (indices, values) pair.
+
+    Results are memoized per query text so repeated searches skip both model
+    forward passes. Tuples are returned so cached entries cannot be mutated.
+    """
+    dense_embedding = next(embedding_model.embed([query]))
+    sparse_result = next(sparse_model.embed([query]))
+    return (
+        tuple(dense_embedding.tolist()),
+        tuple(sparse_result.indices.tolist()),
+        tuple(sparse_result.values.tolist())
+    )
+
+async def hybrid_search(query: str, limit: int):
     """
     Perform a hybrid search using Reciprocal Rank Fusion (RRF) over dense and sparse vectors.
 
@@ -238,21 +764,27 @@ def hybrid_search(query: str, limit: int):
     :param limit: The maximum number of search results to return after fusion.
     :return: A list of search results (Qdrant points) returned by the hybrid RRF search.
     """
-    dense_embedding = list(embedding_model.embed([query]))[0].tolist()
-    sparse_result = list(sparse_model.embed([query]))[0]
+    dense_embedding, sparse_indices, sparse_values = await run_embedding(embed_query, query)
 
-    return qdrant_client.query_points(
+    response = await qdrant_client.query_points(
         collection_name=COLLECTION_NAME,
         prefetch=[
             models.Prefetch(
-                query=dense_embedding,
+                query=list(dense_embedding),
                 using="dense",
-                limit=limit * 3
+                limit=limit * 3,
+                # traverse the quantized index, then rescore the oversampled candidates in full precision
+                params=models.SearchParams(
+                    quantization=models.QuantizationSearchParams(
+                        rescore=True,
+                        oversampling=2.0
+                    )
+                )
             ),
             models.Prefetch(
                 query=SparseVector(
-                    indices=sparse_result.indices.tolist(),
-                    values=sparse_result.values.tolist()
+                    indices=list(sparse_indices),
+                    values=list(sparse_values)
                 ),
                 using="sparse",
                 limit=limit * 3
@@ -260,15 +792,38 @@ def hybrid_search(query: str, limit: int):
         ],
         query=models.FusionQuery(fusion=models.Fusion.RRF),
         limit=limit,
-        with_payload=True,
+        with_payload=models.PayloadSelectorInclude(include=SEARCH_PAYLOAD_FIELDS),
         with_vectors=False
-    ).points
+    )
+    return response.points
+
+async def get_collection_info():
+    """
+    Return the collection info, reusing the last lookup for STATS_CACHE_TTL seconds.
+
+    Concurrent callers that miss the cache wait on one shared refresh, so bursts
+    of dashboard polling cost a single Qdrant request.
+    """
+    if stats_cache["value"] is not None and time.monotonic() < stats_cache["expires"]:
+        return stats_cache["value"]
+    async with stats_cache_lock:
+        if stats_cache["value"] is None or time.monotonic() >= stats_cache["expires"]:
+            stats_cache["value"] = await qdrant_client.get_collection(COLLECTION_NAME)
+            stats_cache["expires"] = time.monotonic() + STATS_CACHE_TTL
+    return stats_cache["value"]
 
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Knowledge Base Server")
-    create_collection_if_not_exists()
+    await create_collection_if_not_exists()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await wikijs_client.aclose()
+    await wikijs_probe_client.aclose()
+    await qdrant_client.close()
+    embed_pool.shutdown(wait=False)
 
 @app.get("/")
 async def root():
@@ -297,7 +852,7 @@ async def root():
 @app.get("/health")
 async def health():
     try:
-        qdrant_client.get_collections()
+        await qdrant_client.get_collections()
         return {
             "status": "healthy",
             "qdrant": "connected",
@@ -321,7 +876,7 @@ async def ingest_document(
 
     if payload.deleted:
         try:
-            scroll_filter = models.Filter(
+            path_filter = models.Filter(
                 must=[
                     models.FieldCondition(
                         key="path",
@@ -333,26 +888,25 @@ async def ingest_document(
                     ),
                 ]
             )
-            scroll_result, next_page = qdrant_client.scroll(
+            chunks_deleted = (await qdrant_client.count(
                 collection_name=COLLECTION_NAME,
-                scroll_filter=scroll_filter,
-                limit=100,
-                with_payload=False,
-                with_vectors=False,
-            )
-            point_ids = [point.id for point in scroll_result]
-            if point_ids:
-                qdrant_client.delete(
+                count_filter=path_filter,
+                exact=True,
+            )).count
+            if chunks_deleted:
+                # delete by filter server-side so documents with any number of chunks are fully removed
+                await qdrant_client.delete(
                     collection_name=COLLECTION_NAME,
-                    points_selector=models.PointIdsList(points=point_ids),
+                    points_selector=models.FilterSelector(filter=path_filter),
+                    wait=False,
                 )
-                logger.info("Deleted %s chunks for %s", len(point_ids), payload.path)
+                logger.info("Deleted %s chunks for %s", chunks_deleted, payload.path)
             else:
                 logger.warning("No chunks found to delete for %s", payload.path)
             return {
                 "status": "success",
                 "action": "deleted",
-                "chunks_deleted": len(point_ids)
+                "chunks_deleted": chunks_deleted
             }
         except Exception as e:
             logger.exception("Delete failed: %s", e)
@@ -361,14 +915,14 @@ async def ingest_document(
     try:
         frontmatter, clean_content = extract_frontmatter(payload.content)
         word_count = len(clean_content.split())
-        logger.info("Ingesting %s words for %s", word_count, payload.path)
+        logger.debug("Ingesting %s words for %s", word_count, payload.path)
         chunks = split_into_chunks(clean_content)
-        logger.info("Generated %s chunks for %s", len(chunks), payload.path)
+        logger.debug("Generated %s chunks for %s", len(chunks), payload.path)
+        embeddings = await run_embedding(embed_chunks, chunks)
+        generate_point_id = point_id_generator(payload.path, payload.repo)
         points = []
-        for idx, chunk in enumerate(chunks):
-            dense_embedding = list(embedding_model.embed([chunk]))[0].tolist()
-            sparse_result = list(sparse_model.embed([chunk]))[0]
-            point_id = generate_point_id(payload.path, payload.repo, idx)
+        for idx, (chunk, (dense_embedding, sparse_result)) in enumerate(zip(chunks, embeddings)):
+            point_id = generate_point_id(idx)
             metadata = {
                 "path": payload.path,
                 "repo": payload.repo,
@@ -378,7 +932,6 @@ async def ingest_document(
                 "tags": frontmatter.get('tags', ''),
                 "chunk_index": idx,
                 "total_chunks": len(chunks),
-                "content": chunk[:500],
                 "full_chunk": chunk
             }
             points.append(PointStruct(
@@ -386,13 +939,18 @@ async def ingest_document(
                 vector={
                     "dense": dense_embedding,
                     "sparse": SparseVector(
-                        indices=sparse_result.indices.tolist(),
-                        values=sparse_result.values.tolist()
+                        indices=sparse_result.indices,
+                        values=sparse_result.values
                     )
                 },
                 payload=metadata
             ))
-        qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
+        for batch_start in range(0, len(points), UPSERT_BATCH_SIZE):
+            await qdrant_client.upsert(
+                collection_name=COLLECTION_NAME,
+                points=points[batch_start:batch_start + UPSERT_BATCH_SIZE],
+                wait=False
+            )
         logger.info("Successfully ingested %s chunks for %s", len(chunks), payload.path)
         return {
             "status": "success",
@@ -409,9 +967,9 @@ async def ingest_document(
 @app.post("/search", response_model=List[SearchResult])
 async def search_documents(request: SearchRequest):
     try:
-        logger.info("Search query received: %s", request.query)
-        results = hybrid_search(request.query, request.limit)
-        logger.info("Search returned %s results", len(results))
+        logger.debug("Search query received: %s", request.query)
+        results = await hybrid_search(request.query, request.limit)
+        logger.debug("Search returned %s results", len(results))
         search_results = []
         for result in results:
             search_results.append(SearchResult(
@@ -430,7 +988,7 @@ async def search_documents(request: SearchRequest):
 @app.post("/rag")
 async def rag_query(request: RAGRequest):
     try:
-        logger.info("RAG query received: %s (provider: %s)", request.query, request.llm_provider)
+        logger.debug("RAG query received: %s (provider: %s)", request.query, request.llm_provider)
 
         if request.llm_provider not in ["groq", "claude"]:
             raise HTTPException(status_code=400, detail="llm_provider must be 'groq' or 'claude'")
@@ -440,8 +998,8 @@ async def rag_query(request: RAGRequest):
         if request.llm_provider == "claude" and not anthropic_client:
             raise HTTPException(status_code=503, detail="Claude is not configured")
 
-        results = hybrid_search(request.query, request.limit)
-        logger.info("RAG retrieved %s relevant chunks", len(results))
+        results = await hybrid_search(request.query, request.limit)
+        logger.debug("RAG retrieved %s relevant chunks", len(results))
 
         if not results:
             return {
@@ -451,21 +1009,21 @@ async def rag_query(request: RAGRequest):
                 "llm_provider": request.llm_provider
             }
 
-        context_parts = []
-        sources = []
-        for idx, result in enumerate(results):
-            title = result.payload.get("title", "Untitled")
-            content = result.payload.get("full_chunk", "")
-            context_parts.append(f"[Document {idx + 1}: {title}]\n{content}\n")
-            sources.append({
-                "title": title,
+        context = "\n".join(
+            f"[Document {idx + 1}: {result.payload.get('title', 'Untitled')}]\n{result.payload.get('full_chunk', '')}\n"
+            for idx, result in enumerate(results)
+        )
+        sources = [
+            {
+                "title": result.payload.get("title", "Untitled"),
                 "path": result.payload.get("path", ""),
                 "score": result.score,
                 "chunk": f"{result.payload.get('chunk_index', 0) + 1}/{result.payload.get('total_chunks', 1)}"
-            })
-            logger.info("Using chunk %s with score %.3f", title, result.score)
-
-        context = "\n".join(context_parts)
+            }
+            for result in results
+        ]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Using chunks with scores %s", ", ".join(f"{result.score:.3f}" for result in results))
 
         system_prompt = """You are a helpful AI assistant that answers questions based on provided documents.
 
@@ -484,7 +1042,7 @@ Question: {request.query}
 Provide a clear answer based only on the documents above."""
 
         if request.llm_provider == "groq":
-            chat_completion = groq_client.chat.completions.create(
+            chat_completion = await groq_client.chat.completions.create(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -497,7 +1055,7 @@ Provide a clear answer based only on the documents above."""
             model_used = "llama-3.3-70b-versatile"
 
         elif request.llm_provider == "claude":
-            message = anthropic_client.messages.create(
+            message = await anthropic_client.messages.create(
                 model="claude-sonnet-4-5-20250929",
                 max_tokens=1000,
                 temperature=0.3,
@@ -509,7 +1067,7 @@ Provide a clear answer based only on the documents above."""
             answer = message.content[0].text
             model_used = "claude-sonnet-4-5-20250929"
 
-        logger.info("RAG answer generated using %s", request.llm_provider)
+        logger.info("RAG answer generated from %s chunks using %s", len(results), request.llm_provider)
 
         return {
             "answer": answer,
@@ -525,8 +1083,7 @@ Provide a clear answer based only on the documents above."""
         logger.exception("RAG failed: %s", e)
         raise HTTPException(status_code=500, detail=f"RAG failed: {str(e)}")
 
-@app.post("/start-process")
-async def start_wiki_setup_process():
+async def run_wiki_setup():
     """
     Orchestrates Wiki.js setup: admin creation, login, git configuration, and guest permissions
     """
@@ -547,6 +1104,9 @@ async def start_wiki_setup_process():
                 detail=f"Missing required environment variables: {', '.join(missing_vars)}"
             )
 
+        if not await wikijs_reachable():
+            raise HTTPException(status_code=503, detail="Wiki.js unreachable")
+
         results = {
             "step1_admin_creation": {},
             "step2_login": {},
@@ -554,116 +1114,90 @@ async def start_wiki_setup_process():
             "step4_guest_permissions": {}
         }
 
-        # create admin user
-        logger.info("Step 1: Creating admin user")
-        admin_payload = {
-            "adminEmail": WIKIJS_ADMIN_EMAIL,
-            "adminPassword": WIKIJS_ADMIN_PASSWORD,
-            "adminPasswordConfirm": WIKIJS_ADMIN_PASSWORD,
-            "siteUrl": WIKIJS_DOMAIN,
-            "telemetry": True
-        }
-
-        admin_response = requests.post(
-            f"{WIKIJS_DOMAIN}/finalize",
-            json=admin_payload,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-
-        if admin_response.status_code != 200:
-            raise HTTPException(
-                status_code=admin_response.status_code,
-                detail=f"Admin creation failed: {admin_response.text}"
-            )
-
-        admin_data = admin_response.json()
-        results["step1_admin_creation"] = admin_data
-        logger.info("Admin user created successfully: %s", admin_data)
-
-        # wait for Wiki.js to complete setup and restart services
-        logger.info("Waiting 10 seconds for Wiki.js to complete initialization...")
-        time.sleep(10)
-
-        # login to get JWT (with retry logic)
-        logger.info("Step 2: Logging in to get JWT token")
-        login_payload = [{
-            "operationName": None,
-            "variables": {
-                "username": WIKIJS_ADMIN_EMAIL,
-                "password": WIKIJS_ADMIN_PASSWORD,
-                "strategy": "local"
-            },
-            "extensions": {},
-            "query": """mutation ($username: String!, $password: String!, $strategy: String!) {
-                authentication {
-                    login(username: $username, password: $password, strategy: $strategy) {
-                        responseResult {
-                            succeeded
-                            errorCode
-                            slug
-                            message
-                            __typename
-                        }
-                        jwt
-                        mustChangePwd
-                        mustProvideTFA
-                        mustSetupTFA
-                        continuationToken
-                        redirect
-                        tfaQRImage
-                        __typename
-                    }
-                    __typename
-                }
-            }"""
-        }]
-
-        # Retry login up to 3 times with 5 second delays
+        # Retry login up to 3 times, backing off exponentially from 5 seconds
         max_retries = 3
+        retry_delay = 5
         login_success = False
         jwt_token = None
 
-        for attempt in range(1, max_retries + 1):
-            try:
-                logger.info("Login attempt %d/%d", attempt, max_retries)
-                login_response = requests.post(
-                    f"{WIKIJS_DOMAIN}/graphql",
-                    json=login_payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=30
+        # a JWT from an earlier run means the admin already exists; reuse it while it
+        # has more than a minute left and skip admin creation and login
+        if wikijs_token["jwt"] and wikijs_token["expires"] - time.time() > 60:
+            jwt_token = wikijs_token["jwt"]
+            results["step1_admin_creation"] = {
+                "status": "skipped",
+                "message": "Admin already created by an earlier run"
+            }
+            results["step2_login"] = {
+                "status": "success",
+                "message": "Reused cached token",
+                "jwt_obtained": True,
+                "attempts": 0
+            }
+            logger.info("Reusing cached JWT token, skipping admin creation and login")
+            login_success = True
+
+        if not login_success:
+            # create admin user
+            logger.info("Step 1: Creating admin user")
+            admin_response = await wikijs_client.post("/finalize", content=WIKIJS_ADMIN_BODY)
+
+            if admin_response.status_code != 200:
+                raise HTTPException(
+                    status_code=admin_response.status_code,
+                    detail=f"Admin creation failed: {admin_response.text}"
                 )
 
-                if login_response.status_code == 200:
-                    login_data = login_response.json()[0]
-
-                    if login_data["data"]["authentication"]["login"]["responseResult"]["succeeded"]:
-                        jwt_token = login_data["data"]["authentication"]["login"]["jwt"]
-                        results["step2_login"] = {
-                            "status": "success",
-                            "message": "Login success",
-                            "jwt_obtained": True,
-                            "attempts": attempt
-                        }
-                        logger.info("Login successful on attempt %d", attempt)
-                        login_success = True
-                        break
+            admin_data = orjson.loads(admin_response.content)
+            results["step1_admin_creation"] = admin_data
+            logger.info("Admin user created successfully: %s", admin_data)
+
+            # wait for Wiki.js to complete setup and restart services
+            logger.info("Waiting 10 seconds for Wiki.js to complete initialization...")
+            await asyncio.sleep(10)
+
+            # login to get JWT (with retry logic)
+            logger.info("Step 2: Logging in to get JWT token")
+
+            for attempt in range(1, max_retries + 1):
+                try:
+                    logger.info("Login attempt %d/%d", attempt, max_retries)
+                    login_response = await wikijs_client.post("/graphql", content=WIKIJS_LOGIN_BODY)
+
+                    if login_response.status_code == 200:
+                        login_result = orjson.loads(login_response.content)[0]["data"]["authentication"]["login"]
+
+                        if login_result["responseResult"]["succeeded"]:
+                            jwt_token = login_result["jwt"]
+                            results["step2_login"] = {
+                                "status": "success",
+                                "message": "Login success",
+                                "jwt_obtained": True,
+                                "attempts": attempt
+                            }
+                            logger.info("Login successful on attempt %d", attempt)
+                            wikijs_token["jwt"] = jwt_token
+                            wikijs_token["expires"] = jwt_expiry(jwt_token)
+                            login_success = True
+                            break
+                        else:
+                            error_msg = login_result["responseResult"]["message"]
+                            logger.warning("Login failed on attempt %d: %s", attempt, error_msg)
+                    elif login_response.status_code == 502:
+                        logger.warning("502 Bad Gateway on attempt %d - Wiki.js still initializing", attempt)
                     else:
-                        error_msg = login_data["data"]["authentication"]["login"]["responseResult"]["message"]
-                        logger.warning("Login failed on attempt %d: %s", attempt, error_msg)
-                elif login_response.status_code == 502:
-                    logger.warning("502 Bad Gateway on attempt %d - Wiki.js still initializing", attempt)
-                else:
-                    logger.warning("Login attempt %d returned status %d", attempt, login_response.status_code)
-
-                if attempt < max_retries:
-                    logger.info("Waiting 5 seconds before retry...")
-                    time.sleep(5)
-
-            except requests.RequestException as e:
-                logger.warning("Network error on attempt %d: %s", attempt, str(e))
-                if attempt < max_retries:
-                    time.sleep(5)
+                        logger.warning("Login attempt %d returned status %d", attempt, login_response.status_code)
+
+                    if attempt < max_retries:
+                        logger.info("Waiting %d seconds before retry...", retry_delay)
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2
+
+                except httpx.HTTPError as e:
+                    logger.warning("Network error on attempt %d: %s", attempt, str(e))
+                    if attempt < max_retries:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2
 
         if not login_success:
             raise HTTPException(
@@ -671,265 +1205,36 @@ async def start_wiki_setup_process():
                 detail=f"Login failed after {max_retries} attempts. Wiki.js may still be initializing."
             )
 
-        # configure git storage
-        logger.info("Step 3: Configuring Git storage")
-
-        # format ssh key properly, handles all formats
-        ssh_key = format_ssh_key(KB_GIT_SSH_PRIVATE_KEY)
-
-        git_config_payload = [{
-            "operationName": None,
-            "variables": {
-                "targets": [
-                    {
-                        "isEnabled": False,
-                        "key": "s3",
-                        "config": [
-                            {"key": "region", "value": "{\"v\":\"\"}"},
-                            {"key": "bucket", "value": "{\"v\":\"\"}"},
-                            {"key": "accessKeyId", "value": "{\"v\":\"\"}"},
-                            {"key": "secretAccessKey", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "azure",
-                        "config": [
-                            {"key": "accountName", "value": "{\"v\":\"\"}"},
-                            {"key": "accountKey", "value": "{\"v\":\"\"}"},
-                            {"key": "containerName", "value": "{\"v\":\"wiki\"}"},
-                            {"key": "storageTier", "value": "{\"v\":\"Cool\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "box",
-                        "config": [
-                            {"key": "clientId", "value": "{\"v\":\"\"}"},
-                            {"key": "clientSecret", "value": "{\"v\":\"\"}"},
-                            {"key": "rootFolder", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "digitalocean",
-                        "config": [
-                            {"key": "endpoint", "value": "{\"v\":\"nyc3.digitaloceanspaces.com\"}"},
-                            {"key": "bucket", "value": "{\"v\":\"\"}"},
-                            {"key": "accessKeyId", "value": "{\"v\":\"\"}"},
-                            {"key": "secretAccessKey", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "dropbox",
-                        "config": [
-                            {"key": "appKey", "value": "{\"v\":\"\"}"},
-                            {"key": "appSecret", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": True,
-                        "key": "git",
-                        "config": [
-                            {"key": "authType", "value": "{\"v\":\"ssh\"}"},
-                            {"key": "repoUrl", "value": f"{{\"v\":\"{KB_REPO_SSH_URL}\"}}"},
-                            {"key": "branch", "value": f"{{\"v\":\"{KB_GIT_BRANCH}\"}}"},
-                            {"key": "sshPrivateKeyMode", "value": "{\"v\":\"contents\"}"},
-                            {"key": "sshPrivateKeyPath", "value": "{\"v\":\"\"}"},
-                            {"key": "sshPrivateKeyContent", "value": json.dumps({"v": ssh_key})},
-                            {"key": "verifySSL", "value": "{\"v\":true}"},
-                            {"key": "basicUsername", "value": "{\"v\":\"\"}"},
-                            {"key": "basicPassword", "value": "{\"v\":\"\"}"},
-                            {"key": "defaultEmail", "value": f"{{\"v\":\"{KB_GIT_COMMIT_EMAIL}\"}}"},
-                            {"key": "defaultName", "value": f"{{\"v\":\"{KB_GIT_COMMIT_NAME}\"}}"},
-                            {"key": "localRepoPath", "value": "{\"v\":\"./data/repo\"}"},
-                            {"key": "alwaysNamespace", "value": "{\"v\":false}"},
-                            {"key": "gitBinaryPath", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "sync",
-                        "syncInterval": "PT5M"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "gdrive",
-                        "config": [
-                            {"key": "clientId", "value": "{\"v\":\"\"}"},
-                            {"key": "clientSecret", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "disk",
-                        "config": [
-                            {"key": "path", "value": "{\"v\":\"\"}"},
-                            {"key": "createDailyBackups", "value": "{\"v\":false}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "onedrive",
-                        "config": [
-                            {"key": "clientId", "value": "{\"v\":\"\"}"},
-                            {"key": "clientSecret", "value": "{\"v\":\"\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "s3generic",
-                        "config": [
-                            {"key": "endpoint", "value": "{\"v\":\"https://service.region.example.com\"}"},
-                            {"key": "bucket", "value": "{\"v\":\"\"}"},
-                            {"key": "accessKeyId", "value": "{\"v\":\"\"}"},
-                            {"key": "secretAccessKey", "value": "{\"v\":\"\"}"},
-                            {"key": "sslEnabled", "value": "{\"v\":true}"},
-                            {"key": "s3ForcePathStyle", "value": "{\"v\":false}"},
-                            {"key": "s3BucketEndpoint", "value": "{\"v\":false}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    },
-                    {
-                        "isEnabled": False,
-                        "key": "sftp",
-                        "config": [
-                            {"key": "host", "value": "{\"v\":\"\"}"},
-                            {"key": "port", "value": "{\"v\":22}"},
-                            {"key": "authMode", "value": "{\"v\":\"privateKey\"}"},
-                            {"key": "username", "value": "{\"v\":\"\"}"},
-                            {"key": "privateKey", "value": "{\"v\":\"\"}"},
-                            {"key": "passphrase", "value": "{\"v\":\"\"}"},
-                            {"key": "password", "value": "{\"v\":\"\"}"},
-                            {"key": "basePath", "value": "{\"v\":\"/root/wiki\"}"}
-                        ],
-                        "mode": "push",
-                        "syncInterval": "P0D"
-                    }
-                ]
-            },
-            "extensions": {},
-            "query": """mutation ($targets: [StorageTargetInput]!) {
-                storage {
-                    updateTargets(targets: $targets) {
-                        responseResult {
-                            succeeded
-                            errorCode
-                            slug
-                            message
-                            __typename
-                        }
-                        __typename
-                    }
-                    __typename
-                }
-            }"""
-        }]
-
-        git_config_response = requests.post(
-            f"{WIKIJS_DOMAIN}/graphql",
-            json=git_config_payload,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {jwt_token}",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            },
-            timeout=30
+        # configure git storage and guest permissions; both only need the JWT,
+        # so they are sent as one batched GraphQL request
+        logger.info("Steps 3-4: Configuring Git storage and Guests group permissions")
+
+        setup_response = await wikijs_client.post(
+            "/graphql",
+            content=WIKIJS_SETUP_MUTATIONS_BODY,
+            headers={"Authorization": f"Bearer {jwt_token}"}
         )
 
-        if git_config_response.status_code != 200:
+        if setup_response.status_code != 200:
             raise HTTPException(
-                status_code=git_config_response.status_code,
-                detail=f"Git configuration failed: {git_config_response.text}"
+                status_code=setup_response.status_code,
+                detail=f"Git configuration and guest permissions update failed: {setup_response.text}"
             )
 
-        git_data = git_config_response.json()[0]
+        git_data, guest_data = orjson.loads(setup_response.content)
 
-        if not git_data["data"]["storage"]["updateTargets"]["responseResult"]["succeeded"]:
-            error_msg = git_data["data"]["storage"]["updateTargets"]["responseResult"]["message"]
-            raise HTTPException(status_code=500, detail=f"Git config failed: {error_msg}")
+        git_result = git_data["data"]["storage"]["updateTargets"]["responseResult"]
+        if not git_result["succeeded"]:
+            raise HTTPException(status_code=500, detail=f"Git config failed: {git_result['message']}")
 
-        results["step3_git_config"] = git_data["data"]["storage"]["updateTargets"]["responseResult"]
+        results["step3_git_config"] = git_result
         logger.info("Git storage configured successfully")
 
-        # update guests group permissions
-        logger.info("Step 4: Updating Guests group permissions")
-
-        guest_permissions_payload = [{
-            "operationName": None,
-            "variables": {
-                "id": 2,
-                "name": "Guests",
-                "redirectOnLogin": "/",
-                "permissions": [],
-                "pageRules": [
-                    {
-                        "id": "guest",
-                        "path": "",
-                        "roles": ["read:pages", "read:assets", "read:comments"],
-                        "match": "START",
-                        "deny": False,
-                        "locales": []
-                    }
-                ]
-            },
-            "extensions": {},
-            "query": """mutation ($id: Int!, $name: String!, $redirectOnLogin: String!, $permissions: [String]!, $pageRules: [PageRuleInput]!) {
-                groups {
-                    update(id: $id, name: $name, redirectOnLogin: $redirectOnLogin, permissions: $permissions, pageRules: $pageRules) {
-                        responseResult {
-                            succeeded
-                            errorCode
-                            slug
-                            message
-                            __typename
-                        }
-                        __typename
-                    }
-                    __typename
-                }
-            }"""
-        }]
-
-        guest_permissions_response = requests.post(
-            f"{WIKIJS_DOMAIN}/graphql",
-            json=guest_permissions_payload,
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {jwt_token}",
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            },
-            timeout=30
-        )
-
-        if guest_permissions_response.status_code != 200:
-            raise HTTPException(
-                status_code=guest_permissions_response.status_code,
-                detail=f"Guest permissions update failed: {guest_permissions_response.text}"
-            )
-
-        guest_data = guest_permissions_response.json()[0]
+        guest_result = guest_data["data"]["groups"]["update"]["responseResult"]
+        if not guest_result["succeeded"]:
+            raise HTTPException(status_code=500, detail=f"Guest permissions failed: {guest_result['message']}")
 
-        if not guest_data["data"]["groups"]["update"]["responseResult"]["succeeded"]:
-            error_msg = guest_data["data"]["groups"]["update"]["responseResult"]["message"]
-            raise HTTPException(status_code=500, detail=f"Guest permissions failed: {error_msg}")
-
-        results["step4_guest_permissions"] = guest_data["data"]["groups"]["update"]["responseResult"]
+        results["step4_guest_permissions"] = guest_result
         logger.info("Guests group permissions updated successfully")
 
         return {
@@ -940,24 +1245,60 @@ async def start_wiki_setup_process():
 
     except HTTPException:
         raise
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.exception("Network error during Wiki setup: %s", e)
         raise HTTPException(status_code=503, detail=f"Network error: {str(e)}")
     except Exception as e:
         logger.exception("Wiki setup process failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Setup failed: {str(e)}")
 
+@app.post("/start-process")
+async def start_wiki_setup_process(force: bool = False):
+    """
+    Run the Wiki.js setup once.
+
+    A successful result is saved to WIKIJS_SETUP_MARKER and returned to later calls
+    on any worker for WIKIJS_SETUP_TTL seconds instead of provisioning again; pass
+    force=true to rerun the setup.
+    Concurrent calls wait for the run in flight: wiki_setup_lock within a worker,
+    an flock on a sibling lock file across workers.
+    """
+    async with wiki_setup_lock:
+        with open(f"{WIKIJS_SETUP_MARKER}.lock", "w") as lock_file:
+            await acquire_wiki_setup_flock(lock_file)
+            try:
+                if not force:
+                    previous_result = read_wiki_setup_marker()
+                    if previous_result is not None:
+                        logger.info("Wiki.js setup already completed, returning previous result")
+                        return previous_result
+                result = await run_wiki_setup()
+                try:
+                    write_wiki_setup_marker(result)
+                except OSError as e:
+                    logger.warning("Could not save setup marker %s: %s", WIKIJS_SETUP_MARKER, e)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 
 @app.get("/stats")
-async def collection_stats():
+async def collection_stats(request: Request):
     try:
-        collection_info = qdrant_client.get_collection(COLLECTION_NAME)
-        return {
-            "collection_name": COLLECTION_NAME,
-            "total_points": collection_info.points_count,
-            "search_mode": "Hybrid RRF (Dense + Sparse BM25)",
-            "status": "active"
-        }
+        collection_info = await get_collection_info()
+        # the body only changes with the point count, so pollers can revalidate cheaply
+        etag = f'W/"{collection_info.points_count}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return ORJSONResponse(
+            content={
+                "collection_name": COLLECTION_NAME,
+                "total_points": collection_info.points_count,
+                "search_mode": "Hybrid RRF (Dense + Sparse BM25)",
+                "status": "active"
+            },
+            headers={"ETag": etag}
+        )
     except Exception as e:
         logger.exception("Stats retrieval failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Stats failed: {str(e)}")
@@ -966,5 +1307,13 @@ async def collection_stats():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    logger.info("Starting Uvicorn on port %s", port)
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    logger.info("Starting Uvicorn on port %s with %s workers", port, WEB_CONCURRENCY)
+    # multiple workers need an import string so each process builds its own models and client pools
+    uvicorn.run(
+        app if WEB_CONCURRENCY == 1 else "app:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=WEB_CONCURRENCY
+    )
\ No newline at end of file